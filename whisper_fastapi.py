@@ -1,29 +1,42 @@
 import asyncio
-from functools import partial
+import atexit
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from contextlib import asynccontextmanager
 import aiohttp
 import os
 import sys
+import threading
+import logging
+import logging.handlers
+import queue
 import dataclasses
+import ctranslate2
 import faster_whisper
-import json
-from fastapi.responses import PlainTextResponse, StreamingResponse
+import orjson
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 import wave
+from faster_whisper.audio import decode_audio
 from faster_whisper.vad import VadOptions
-import pydub
 import io
+import numpy as np
 import hashlib
 import argparse
 import uvicorn
+from cachetools import TTLCache
 from typing import (
     Annotated,
     Any,
+    AsyncIterator,
     BinaryIO,
     Literal,
     Generator,
     Optional,
     Tuple,
     Iterable,
+    Iterator,
+    TypeVar,
     Union,
 )
 from fastapi import (
@@ -37,7 +50,6 @@ from fastapi import (
     WebSocket,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from src.whisper_ctranslate2.writers import format_timestamp
 from faster_whisper.transcribe import Segment, TranscriptionInfo
 from faster_whisper.tokenizer import _LANGUAGE_CODES
 import opencc
@@ -49,14 +61,6 @@ from wyoming.asr import Transcribe, Transcript
 from wyoming.info import Describe, Info
 from wyoming.info import AsrModel, AsrProgram, Attribution, Info
 
-# redirect print to stderr
-_print = print
-
-
-def print(*args, **kwargs):
-    _print(*args, file=sys.stderr, **kwargs)
-
-
 parser = argparse.ArgumentParser()
 parser.add_argument("--host", default="0.0.0.0", type=str)
 parser.add_argument("--wyoming-uri", default="tcp://0.0.0.0:3001", type=str)
@@ -66,32 +70,125 @@ parser.add_argument("--device", default="auto", type=str)
 parser.add_argument("--cache_dir", default=None, type=str)
 parser.add_argument("--local_files_only", default=False, type=bool)
 parser.add_argument("--threads", default=4, type=int)
+parser.add_argument("--num_workers", default=1, type=int)
+parser.add_argument("--compute_type", "--quantization", default=None, type=str)
+parser.add_argument("--batch_size", default=8, type=int)
+parser.add_argument("--log_level", default="DEBUG", type=str)
 args = parser.parse_args()
 
+# log records are queued and written to stderr by a background thread,
+# so logging never blocks the event loop
+log_queue: queue.Queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    log_queue, logging.StreamHandler(sys.stderr)
+)
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger("whisper")
+logger.setLevel(args.log_level.upper())
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+logger.propagate = False
+
+# half precision on GPU runs the encoder/decoder GEMMs on tensor cores,
+# int8 is the fastest option on CPU
+if args.compute_type is None:
+    use_cuda = args.device == "cuda" or (
+        args.device == "auto" and ctranslate2.get_cuda_device_count() > 0
+    )
+    if not use_cuda:
+        args.compute_type = "int8"
+    elif "float16" in ctranslate2.get_supported_compute_types("cuda"):
+        args.compute_type = "float16"
+    else:
+        # GPUs without efficient float16 (e.g. Pascal) refuse to load it
+        args.compute_type = "default"
+
+
+# shared by gpt_refine_text to keep the connection to the LLM alive
+http_session: aiohttp.ClientSession | None = None
+
 
 # for home assistant wyoming server
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    global http_session
+    http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=60),
+    )
     server = AsyncServer.from_uri(args.wyoming_uri)
-    print(f"Running wyoming server at {args.wyoming_uri}")
+    logger.info("Running wyoming server at %s", args.wyoming_uri)
     asyncio.create_task(server.run(partial(Handler)))
     yield
+    await http_session.close()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Instrument your app with default metrics and expose the metrics
 Instrumentator().instrument(app).expose(app, endpoint="/konele/metrics")
-ccc = opencc.OpenCC("t2s.json")
 
-print(f"Loading model to device {args.device}...")
+# segments are converted from worker threads, keep one OpenCC per thread
+opencc_local = threading.local()
+
+
+def get_opencc() -> opencc.OpenCC:
+    ccc = getattr(opencc_local, "ccc", None)
+    if ccc is None:
+        ccc = opencc_local.ccc = opencc.OpenCC("t2s.json")
+        # load the dictionary now instead of on the first chinese segment
+        ccc.convert("测试")
+    return ccc
+
+
+# short segments like fillers repeat a lot, within and across transcripts
+@lru_cache(maxsize=4096)
+def convert_t2s(text: str) -> str:
+    return get_opencc().convert(text)
+
+
+# fail fast on a broken OpenCC install and get the dictionary files cached
+get_opencc()
+
+logger.info("Loading model to device %s with %s...", args.device, args.compute_type)
 model = faster_whisper.WhisperModel(
     model_size_or_path=args.model,
     device=args.device,
+    compute_type=args.compute_type,
     cpu_threads=args.threads,
+    num_workers=args.num_workers,
     local_files_only=args.local_files_only,
 )
-print(f"Model loaded to device {model.model.device}")
+logger.info("Model loaded to device %s", model.model.device)
+
+# blocking decode/transcribe calls run here to keep the event loop free.
+# segment generators are advanced one segment per task (iterate_in_pool), so
+# at most num_workers segments decode at once and a long transcript does not
+# hold a thread while other requests wait to decode their audio
+transcribe_pool = ThreadPoolExecutor(
+    max_workers=args.num_workers,
+    thread_name_prefix="transcribe",
+    initializer=get_opencc,
+)
+
+
+async def run_in_pool(func, *func_args):
+    return await asyncio.get_running_loop().run_in_executor(
+        transcribe_pool, func, *func_args
+    )
+
+
+T = TypeVar("T")
+
+
+async def iterate_in_pool(iterator: Iterator[T]) -> AsyncIterator[T]:
+    # starlette's iterate_in_threadpool, but on transcribe_pool
+    done = object()
+    while True:
+        item = await run_in_pool(next, iterator, done)
+        if item is done:
+            break
+        yield item
 
 
 # allow all cors
@@ -104,10 +201,8 @@ app.add_middleware(
 )
 
 
-async def gpt_refine_text(
-    ge: Generator[Segment, None, None], info: TranscriptionInfo, context: str
-) -> str:
-    text = build_json_result(ge, info).text.strip()
+async def gpt_refine_text(ge: Generator[Segment, None, None], context: str) -> str:
+    text = (await collect_text_only(ge)).strip()
     model = os.environ.get("OPENAI_LLM_MODEL", "gpt-4o-mini")
     if not text:
         return ""
@@ -135,23 +230,45 @@ transcription: {text}
             },
         ],
     }
-    print(f"Refining text length: {len(text)} with {model}")
-    print(body)
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
-            + "/chat/completions",
-            json=body,
-            headers={
-                "Authorization": f'Bearer {os.environ["OPENAI_API_KEY"]}',
-            },
-        ) as response:
-            return (await response.json())["choices"][0]["message"]["content"]
+    logger.info("Refining text length: %d with %s", len(text), model)
+    logger.debug(body)
+    assert http_session is not None
+    async with http_session.post(
+        os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        + "/chat/completions",
+        json=body,
+        headers={
+            "Authorization": f'Bearer {os.environ["OPENAI_API_KEY"]}',
+        },
+    ) as response:
+        return (await response.json())["choices"][0]["message"]["content"]
+
+
+def format_timestamp(
+    seconds: float, always_include_hours: bool = False, decimal_marker: str = "."
+) -> str:
+    assert seconds >= 0, "non-negative timestamp expected"
+    # integer math on milliseconds only
+    seconds, milliseconds = divmod(round(seconds * 1000), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    hours_marker = f"{hours:02d}:" if always_include_hours or hours > 0 else ""
+    return f"{hours_marker}{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+
+def srt_timestamp(seconds: float) -> str:
+    # format_timestamp(decimal_marker=",", always_include_hours=True) unrolled
+    seconds, milliseconds = divmod(round(seconds * 1000), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
 
 
 def stream_writer(generator: Generator[Segment, Any, None]):
     for segment in generator:
-        yield "data: " + json.dumps(segment, ensure_ascii=False) + "\n\n"
+        # word timestamps leave numpy.float64 in the segment and word timings
+        data = orjson.dumps(segment, option=orjson.OPT_SERIALIZE_NUMPY)
+        yield "data: " + data.decode() + "\n\n"
     yield "data: [DONE]\n\n"
 
 
@@ -171,12 +288,8 @@ def tsv_writer(generator: Generator[Segment, Any, None]):
 
 def srt_writer(generator: Generator[Segment, Any, None]):
     for i, segment in enumerate(generator):
-        start_time = format_timestamp(
-            segment.start, decimal_marker=",", always_include_hours=True
-        )
-        end_time = format_timestamp(
-            segment.end, decimal_marker=",", always_include_hours=True
-        )
+        start_time = srt_timestamp(segment.start)
+        end_time = srt_timestamp(segment.end)
         text = segment.text.strip()
         yield f"{i}\n{start_time} --> {end_time}\n{text}\n\n"
 
@@ -201,15 +314,60 @@ def build_json_result(
     info: TranscriptionInfo,
 ) -> JsonResult:
     segments = [i for i in generator]
+    # shallow copy, dataclasses.asdict() would deep copy every nested field
     return JsonResult(
         text="\n".join(i.text for i in segments),
         segments=segments,
-        **dataclasses.asdict(info),
+        **{f.name: getattr(info, f.name) for f in dataclasses.fields(info)},
     )
 
 
-def stream_builder(
-    audio: BinaryIO,
+async def collect_text_only(generator: Iterator[Segment]) -> str:
+    # same text as build_json_result without keeping the segments around
+    return "\n".join([i.text async for i in iterate_in_pool(generator)])
+
+
+def pcm_to_audio(
+    pcm: bytes | bytearray | memoryview,
+    rate: int = 16000,
+    width: int = 2,
+    channels: int = 1,
+) -> np.ndarray:
+    """Convert raw PCM to the 16kHz mono float32 array faster-whisper expects"""
+    if rate != 16000 or width != 2:
+        # let PyAV do the resampling
+        file_obj = io.BytesIO()
+        with wave.open(file_obj, "wb") as buffer:
+            buffer.setnchannels(channels)
+            buffer.setsampwidth(width)
+            buffer.setframerate(rate)
+            buffer.writeframes(pcm)
+        file_obj.seek(0)
+        return decode_audio(file_obj)
+
+    # drop trailing partial frame
+    frame_size = 2 * channels
+    pcm = memoryview(pcm)[: len(pcm) // frame_size * frame_size]
+    # s16le is little endian regardless of the host, scale in place to
+    # avoid a second float32 buffer
+    audio = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    audio *= 1.0 / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+def audio_fingerprint(audio: np.ndarray) -> str:
+    # language detection only looks at the first 30 seconds
+    return hashlib.blake2s(audio[: 30 * 16000].tobytes(), digest_size=16).hexdigest()
+
+
+# detected language keyed by audio_fingerprint
+language_cache: TTLCache = TTLCache(maxsize=512, ttl=3600)
+
+
+async def stream_builder(
+    audio: BinaryIO | np.ndarray,
     task: str,
     vad_filter: bool,
     language: str | None,
@@ -217,30 +375,125 @@ def stream_builder(
     repetition_penalty: float = 1.0,
     vad_options: Optional[VadOptions] = None,
 ) -> Tuple[Generator[Segment, None, None], TranscriptionInfo]:
-    segments, info = model.transcribe(
-        audio=audio,
-        language=language,
-        task=task,
-        vad_filter=vad_filter,
-        initial_prompt=initial_prompt if initial_prompt else None,
-        word_timestamps=True,
-        repetition_penalty=repetition_penalty,
-        vad_parameters=vad_options,
+    if not isinstance(audio, np.ndarray):
+        audio = await run_in_pool(decode_audio, audio)
+
+    fingerprint = None
+    if language is None:
+        fingerprint = await run_in_pool(audio_fingerprint, audio)
+        language = language_cache.get(fingerprint)
+        if language is not None:
+            logger.debug("Language cache hit '%s'", language)
+
+    transcribe = model.transcribe
+    if vad_filter and args.batch_size > 1:
+        # encode the VAD split chunks in batches instead of one by one, the
+        # pipeline keeps per transcript state so every call gets its own
+        batched_model = faster_whisper.BatchedInferencePipeline(model=model)
+        transcribe = partial(
+            batched_model.transcribe,
+            batch_size=args.batch_size,
+            # keep sentence level segments instead of one per VAD chunk
+            without_timestamps=False,
+        )
+        # the pipeline cuts every merged VAD chunk at chunk_length, but only
+        # caps the merging itself for dict or None vad_parameters
+        chunk_length = model.feature_extractor.chunk_length
+        if vad_options is not None and vad_options.max_speech_duration_s > chunk_length:
+            vad_options = dataclasses.replace(
+                vad_options, max_speech_duration_s=chunk_length
+            )
+
+    segments, info = await run_in_pool(
+        partial(
+            transcribe,
+            audio=audio,
+            language=language,
+            task=task,
+            vad_filter=vad_filter,
+            initial_prompt=initial_prompt if initial_prompt else None,
+            word_timestamps=True,
+            repetition_penalty=repetition_penalty,
+            vad_parameters=vad_options,
+        )
     )
-    print(
-        "Detected language '%s' with probability %f"
-        % (info.language, info.language_probability)
+    logger.info(
+        "Detected language '%s' with probability %f",
+        info.language,
+        info.language_probability,
     )
+    if fingerprint is not None:
+        language_cache[fingerprint] = info.language
 
     def wrap():
         for segment in segments:
             if info.language == "zh":
-                segment.text = ccc.convert(segment.text)
+                segment.text = convert_t2s(segment.text)
             yield segment
 
     return wrap(), info
 
 
+# konele results keyed by audio md5 and request options
+transcript_cache: TTLCache = TTLCache(maxsize=512, ttl=3600)
+transcript_cache_lock = asyncio.Lock()
+
+
+async def konele_transcribe(
+    data: bytes | bytearray | memoryview,
+    md5: str,
+    content_type: str,
+    task: str,
+    lang: str,
+    initial_prompt: str,
+    vad_filter: bool,
+    gpt_refine: bool,
+    channels: int = 1,
+    rate: int = 16000,
+) -> str:
+    cache_key = (
+        md5,
+        content_type,
+        channels,
+        rate,
+        task,
+        lang,
+        initial_prompt,
+        vad_filter,
+        gpt_refine,
+    )
+    async with transcript_cache_lock:
+        result = transcript_cache.get(cache_key)
+    if result is not None:
+        logger.debug("Transcript cache hit %s", md5)
+        return result
+
+    if content_type.startswith("audio/x-flac"):
+        # decode and resample in process with PyAV instead of spawning ffmpeg
+        audio = await run_in_pool(decode_audio, io.BytesIO(data))
+    else:
+        audio = await run_in_pool(
+            partial(pcm_to_audio, data, rate=rate, channels=channels)
+        )
+
+    generator, info = await stream_builder(
+        audio=audio,
+        task=task,
+        vad_filter=vad_filter,
+        language=None if lang == "und" else lang,
+        initial_prompt=initial_prompt,
+    )
+
+    if gpt_refine:
+        result = await gpt_refine_text(generator, initial_prompt)
+    else:
+        result = await collect_text_only(generator)
+
+    async with transcript_cache_lock:
+        transcript_cache[cache_key] = result
+    return result
+
+
 @app.websocket("/k6nele/status")
 @app.websocket("/konele/status")
 @app.websocket("/v1/k6nele/status")
@@ -274,46 +527,41 @@ async def konele_ws(
     # convert lang code format (eg. en-US to en)
     lang = lang.split("-")[0]
 
-    data = b""
+    buf = bytearray()
+    md5_hash = hashlib.md5()
     while True:
-        try:
-            data += await websocket.receive_bytes()
-            if data[-3:] == b"EOS":
-                break
-        except:
+        # read the raw frames, receive_bytes() raises on text frames
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            # client is gone, nobody to send the transcript to
+            return
+        chunk = message.get("bytes")
+        if chunk is None:
+            # text frame, i.e. EOS
+            break
+        md5_hash.update(chunk)
+        buf.extend(chunk)
+        if buf.endswith(b"EOS"):
             break
 
-    md5 = hashlib.md5(data).hexdigest()
-
-    # create fake file for wave.open
-    file_obj = io.BytesIO()
-
-    if content_type.startswith("audio/x-flac"):
-        pydub.AudioSegment.from_file(io.BytesIO(data), format="flac").export(
-            file_obj, format="wav"
-        )
-    else:
-        buffer = wave.open(file_obj, "wb")
-        buffer.setnchannels(1)
-        buffer.setsampwidth(2)
-        buffer.setframerate(16000)
-        buffer.writeframes(data)
+    md5 = md5_hash.hexdigest()
 
-    file_obj.seek(0)
+    # strip the EOS marker without copying the audio
+    data = memoryview(buf)
+    if buf.endswith(b"EOS"):
+        data = data[:-3]
 
-    generator, info = stream_builder(
-        audio=file_obj,
+    result = await konele_transcribe(
+        data=data,
+        md5=md5,
+        content_type=content_type,
         task=task,
-        vad_filter=vad_filter,
-        language=None if lang == "und" else lang,
+        lang=lang,
         initial_prompt=initial_prompt,
+        vad_filter=vad_filter,
+        gpt_refine=websocket.url.path.endswith("gpt_refine"),
     )
 
-    if websocket.url.path.endswith("gpt_refine"):
-        result = await gpt_refine_text(generator, info, initial_prompt)
-    else:
-        result = build_json_result(generator, info).text
-
     await websocket.send_json(
         {
             "status": 0,
@@ -351,38 +599,26 @@ async def translateapi(
     channels = int(info.get("channels", "1"))
     rate = int(info.get("rate", "16000"))
 
-    body = await request.body()
-    md5 = hashlib.md5(body).hexdigest()
-
-    # create fake file for wave.open
-    file_obj = io.BytesIO()
-
-    if content_type.startswith("audio/x-flac"):
-        pydub.AudioSegment.from_file(io.BytesIO(body), format="flac").export(
-            file_obj, format="wav"
-        )
-    else:
-        buffer = wave.open(file_obj, "wb")
-        buffer.setnchannels(channels)
-        buffer.setsampwidth(2)
-        buffer.setframerate(rate)
-        buffer.writeframes(body)
-
-    file_obj.seek(0)
-
-    generator, info = stream_builder(
-        audio=file_obj,
+    body = bytearray()
+    md5_hash = hashlib.md5()
+    async for chunk in request.stream():
+        md5_hash.update(chunk)
+        body.extend(chunk)
+    md5 = md5_hash.hexdigest()
+
+    result = await konele_transcribe(
+        data=body,
+        md5=md5,
+        content_type=content_type,
         task=task,
-        vad_filter=vad_filter,
-        language=None if lang == "und" else lang,
+        lang=lang,
         initial_prompt=initial_prompt,
+        vad_filter=vad_filter,
+        gpt_refine=request.url.path.endswith("gpt_refine"),
+        channels=channels,
+        rate=rate,
     )
 
-    if request.url.path.endswith("gpt_refine"):
-        result = await gpt_refine_text(generator, info, initial_prompt)
-    else:
-        result = build_json_result(generator, info).text
-
     return {
         "status": 0,
         "hypotheses": [{"utterance": result}],
@@ -437,7 +673,7 @@ async def transcription(
         vad_options.speech_pad_ms = vad_speech_pad_ms
 
     # timestamp as filename, keep original extension
-    generator, info = stream_builder(
+    generator, info = await stream_builder(
         audio=io.BytesIO(file.file.read()),
         task=task,
         vad_filter=vad_filter,
@@ -450,21 +686,32 @@ async def transcription(
     # special function for streaming response (OpenAI API does not have this)
     if response_format == "stream":
         return StreamingResponse(
-            stream_writer(generator),
+            iterate_in_pool(stream_writer(generator)),
             media_type="text/event-stream",
         )
     elif response_format == "json":
-        return build_json_result(generator, info)
+        # returning a response skips FastAPI's response_model validation,
+        # which would copy the whole result again, orjson walks the dataclasses
+        segments = [i async for i in iterate_in_pool(generator)]
+        return ORJSONResponse(build_json_result(segments, info))
     elif response_format == "text":
         if gpt_refine:
-            return PlainTextResponse(await gpt_refine_text(generator, info, prompt))
-        return StreamingResponse(text_writer(generator), media_type="text/plain")
+            return PlainTextResponse(await gpt_refine_text(generator, prompt))
+        return StreamingResponse(
+            iterate_in_pool(text_writer(generator)), media_type="text/plain"
+        )
     elif response_format == "tsv":
-        return StreamingResponse(tsv_writer(generator), media_type="text/plain")
+        return StreamingResponse(
+            iterate_in_pool(tsv_writer(generator)), media_type="text/plain"
+        )
     elif response_format == "srt":
-        return StreamingResponse(srt_writer(generator), media_type="text/plain")
+        return StreamingResponse(
+            iterate_in_pool(srt_writer(generator)), media_type="text/plain"
+        )
     elif response_format == "vtt":
-        return StreamingResponse(vtt_writer(generator), media_type="text/plain")
+        return StreamingResponse(
+            iterate_in_pool(vtt_writer(generator)), media_type="text/plain"
+        )
 
     raise HTTPException(400, "Invailed response_format")
 
@@ -472,48 +719,56 @@ async def transcription(
 # for home assitant
 # code from https://github.com/rhasspy/wyoming-faster-whisper
 class Handler(AsyncEventHandler):
-    file_obj: io.BytesIO | None = None
-    wav_file: wave.Wave_write | None = None
+    chunks: list[bytes] | None = None
+    rate: int = 16000
+    width: int = 2
+    channels: int = 1
     lang: str | None = None
 
     async def handle_event(self, event: Event) -> bool:
         if AudioChunk.is_type(event.type):
             chunk = AudioChunk.from_event(event)
 
-            if self.wav_file is None:
-                print("AudioChunk begin")
-                self.file_obj = io.BytesIO()
-                self.wav_file = wave.open(self.file_obj, "wb")
-                self.wav_file.setframerate(chunk.rate)
-                self.wav_file.setsampwidth(chunk.width)
-                self.wav_file.setnchannels(chunk.channels)
+            if self.chunks is None:
+                logger.debug("AudioChunk begin")
+                self.chunks = []
+                self.rate = chunk.rate
+                self.width = chunk.width
+                self.channels = chunk.channels
 
-            self.wav_file.writeframes(chunk.audio)
+            # keep the received buffers, they are joined once on AudioStop
+            self.chunks.append(chunk.audio)
             return True
 
         if AudioStop.is_type(event.type):
-            print("AudioStop")
-            assert self.wav_file is not None
-            assert self.file_obj is not None
-            self.wav_file.close()
-            self.wav_file = None
-            self.file_obj.seek(0)
-
-            generator, info = stream_builder(
-                audio=self.file_obj,
+            logger.debug("AudioStop")
+            assert self.chunks is not None
+            audio = await run_in_pool(
+                partial(
+                    pcm_to_audio,
+                    b"".join(self.chunks),
+                    rate=self.rate,
+                    width=self.width,
+                    channels=self.channels,
+                )
+            )
+            self.chunks = None
+
+            generator, info = await stream_builder(
+                audio=audio,
                 task="transcribe",
                 vad_filter=False,
                 language=self.lang,
             )
-            text = build_json_result(generator, info).text
-            print(text)
+            text = await collect_text_only(generator)
+            logger.debug(text)
             await self.write_event(Transcript(text=text).event())
 
             self.lang = None
             return False
 
         if Transcribe.is_type(event.type):
-            print("Transcribe")
+            logger.debug("Transcribe")
             transcribe = Transcribe.from_event(event)
             if transcribe.language:
                 self.lang = transcribe.language
@@ -521,7 +776,7 @@ class Handler(AsyncEventHandler):
             return True
 
         if Describe.is_type(event.type):
-            print("Describe")
+            logger.debug("Describe")
             await self.write_event(
                 Info(
                     asr=[
@@ -558,4 +813,18 @@ class Handler(AsyncEventHandler):
         return True
 
 
-uvicorn.run(app, host=args.host, port=args.port)
+# uvicorn[standard] does not install uvloop/httptools everywhere (Windows,
+# PyPy), use them when available instead of failing to start
+loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+logger.info("Running uvicorn with %s loop and %s http", loop, http)
+uvicorn.run(
+    app,
+    host=args.host,
+    port=args.port,
+    loop=loop,
+    http=http,
+    ws="websockets",
+    # audio does not compress, skip inflating every frame
+    ws_per_message_deflate=False,
+)